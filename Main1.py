@@ -20,10 +20,7 @@ except Exception:
 # -----------------------------
 # MIDI helpers
 # -----------------------------
-CHANNEL_MSGS = {"note_on", "note_off", "control_change", "program_change", "pitchwheel", "aftertouch", "polytouch"}
-
-def is_channel_msg(msg) -> bool:
-    return (not getattr(msg, "is_meta", False)) and (msg.type in CHANNEL_MSGS)
+CHANNEL_MSGS: frozenset[str] = frozenset({"note_on", "note_off", "control_change", "program_change", "pitchwheel", "aftertouch", "polytouch"})
 
 
 def iter_abs_messages(mid: MidiFile) -> List[Tuple[int, Message]]:
@@ -32,7 +29,7 @@ def iter_abs_messages(mid: MidiFile) -> List[Tuple[int, Message]]:
         t = 0
         for msg in tr:
             t += msg.time
-            if is_channel_msg(msg):
+            if not msg.is_meta and msg.type in CHANNEL_MSGS:
                 events.append((t, msg.copy()))
     events.sort(key=lambda x: x[0])
     return events
@@ -102,7 +99,9 @@ def extract_clean_bars(mid: MidiFile) -> List[List[Tuple[int, Message]]]:
     n_bars = max(1, (end_time // bar_len) + 1)
 
     safe_bars: List[List[Tuple[int, Message]]] = []
-    active: Dict[Tuple[int, int], int] = {}
+    # Sounding notes, indexed by channel<<7 | note; open_count makes the silence check O(1)
+    active = bytearray(16 * 128)
+    open_count = 0
 
     idx = 0
     for b in range(n_bars):
@@ -112,28 +111,40 @@ def extract_clean_bars(mid: MidiFile) -> List[List[Tuple[int, Message]]]:
         while idx < len(events) and events[idx][0] < start:
             _, m = events[idx]
             if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
+                k = (m.channel << 7) | m.note
+                if not active[k]:
+                    active[k] = 1
+                    open_count += 1
             elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
+                k = (m.channel << 7) | m.note
+                if active[k]:
+                    active[k] = 0
+                    open_count -= 1
             idx += 1
 
-        starts_silent = (len(active) == 0)
+        starts_silent = (open_count == 0)
 
         bar_events_abs: List[Tuple[int, Message]] = []
         scan_j = idx
         while scan_j < len(events) and events[scan_j][0] < end:
             t, m = events[scan_j]
             if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
+                k = (m.channel << 7) | m.note
+                if not active[k]:
+                    active[k] = 1
+                    open_count += 1
             elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
+                k = (m.channel << 7) | m.note
+                if active[k]:
+                    active[k] = 0
+                    open_count -= 1
             rel_t = t - start
             nm = m.copy()
             nm.time = 0
             bar_events_abs.append((rel_t, nm))
             scan_j += 1
 
-        ends_silent = (len(active) == 0)
+        ends_silent = (open_count == 0)
 
         if starts_silent and ends_silent and bar_events_abs:
             bar_events_abs.sort(key=lambda x: x[0])
@@ -200,19 +211,30 @@ def build_from_spins(midis: List[Tuple[str, MidiFile]], spins: List[int], tpb_ou
     events: List[Tuple[int, Message]] = []
     abs_out_time = 0
     bar_len_out = ticks_per_bar(tpb_out, num, den)
+    # Only a handful of distinct source tpbs exist, so divide once per tpb rather than once per bar
+    scales: Dict[int, float] = {src_tpb: tpb_out / float(src_tpb) for src_tpb in {p[0] for p in pool}}
     log_lines = []
 
+    phrases = []
     for spin_idx, total in enumerate(spins):
         total = max(2, min(12, int(total)))
         phrase = dice_table[spin_idx][total - 2]
         log_lines.append(f"Spin {spin_idx+1}: total={total} → phrase from {[name for (_, name, _, _) in phrase]}")
+        phrases.append(phrase)
+    # If every chosen bar is already at tpb_out, bars are copied without rescaling
+    identity_scale = all(src_tpb == tpb_out for phrase in phrases for (src_tpb, _, _, _) in phrase)
+
+    for phrase in phrases:
         # Append the 4 bars
         for src_tpb, name, bar_idx, bar in phrase:
             # scale rel ticks to output tpb
-            scale = tpb_out / float(src_tpb)
-            rel_abs = [(int(round(rt * scale)), m.copy()) for (rt, m) in bar]
-            rebased = [(abs_out_time + t, m) for (t, m) in rel_abs]
-            events.extend(rebased)
+            if identity_scale:
+                events.extend((abs_out_time + rt, m.copy()) for (rt, m) in bar)
+            else:
+                scale = scales[src_tpb]
+                rel_abs = [(int(round(rt * scale)), m.copy()) for (rt, m) in bar]
+                rebased = [(abs_out_time + t, m) for (t, m) in rel_abs]
+                events.extend(rebased)
             abs_out_time += bar_len_out
 
     # Build MIDI
@@ -1,16 +1,24 @@
 # mozart_dice_game_gui.py
 # Visual Dice Game (Tkinter Canvas) + Mozart-based melody generation from your local MIDIs
-# Requirements: Python 3.11+, Tkinter (built-in), and mido -> pip install mido
+# Requirements: Python 3.11+, Tkinter (built-in), symusic, numpy and mido -> pip install symusic numpy mido
 # Usage: put this file next to your Mozart .mid files (confuta.mid, jm_mozdi.mid, mozeine.mid, cosifn2t.mid, etc.)
 # Run:   python mozart_dice_game_gui.py
 
 from __future__ import annotations
 import os
 import random
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, NamedTuple, Optional
+
+try:
+    import numpy as np
+    from symusic import Score
+except Exception:
+    raise SystemExit("This app needs the 'symusic' and 'numpy' packages. Install with: pip install symusic numpy")
 
 try:
     from mido import MidiFile, MidiTrack, Message, MetaMessage, bpm2tempo
@@ -20,189 +28,277 @@ except Exception:
 # =============================
 # MIDI helpers
 # =============================
-CHANNEL_MSGS = {"note_on", "note_off", "control_change", "program_change", "pitchwheel", "aftertouch", "polytouch"}
-
-def is_channel_msg(msg) -> bool:
-    return (not getattr(msg, "is_meta", False)) and (msg.type in CHANNEL_MSGS)
-
-def iter_abs_messages(mid: MidiFile) -> List[Tuple[int, Message]]:
-    events: List[Tuple[int, Message]] = []
-    for tr in mid.tracks:
-        t = 0
-        for msg in tr:
-            t += msg.time
-            if is_channel_msg(msg):
-                events.append((t, msg.copy()))
-    events.sort(key=lambda x: x[0])
-    return events
-
-def first_meta(mid: MidiFile, meta_type: str):
-    for tr in mid.tracks:
-        for msg in tr:
-            if getattr(msg, "is_meta", False) and msg.type == meta_type:
-                return msg
-    return None
-
-def get_time_signature(mid: MidiFile) -> Tuple[int, int]:
-    ts = first_meta(mid, "time_signature")
-    if ts:
+# MIDI files are parsed with symusic (C++); mido is only used to write the composed result.
+# symusic keeps notes, control changes, pitch bends and one program per track, but not MIDI
+# channels or aftertouch: channels are reassigned one per track (see track_channels) and
+# aftertouch / polytouch messages are dropped.
+
+# ChannelEvents.kind values
+EV_NOTE_OFF, EV_NOTE_ON, EV_CONTROL, EV_PITCHWHEEL, EV_PROGRAM = range(5)
+
+class ChannelEvents(NamedTuple):
+    """Channel events as parallel arrays; mido Messages are only built when writing."""
+    t: np.ndarray       # int64 tick (absolute, or relative to the bar after extraction)
+    kind: np.ndarray    # int8 EV_* code
+    ch: np.ndarray      # int8 channel
+    num: np.ndarray     # int8 note / control number / program
+    val: np.ndarray     # int16 velocity / control value / pitch bend (0 when unused)
+
+    def take(self, idx) -> ChannelEvents:
+        return ChannelEvents(*(a[idx] for a in self))
+
+    @staticmethod
+    def concat(parts: List[ChannelEvents]) -> ChannelEvents:
+        return ChannelEvents(*(np.concatenate(cols) for cols in zip(*parts)))
+
+    @staticmethod
+    def of(t, kind: int, ch: int, num, val) -> ChannelEvents:
+        n = len(t)
+        return ChannelEvents(np.asarray(t, dtype=np.int64), np.full(n, kind, dtype=np.int8),
+                             np.full(n, ch, dtype=np.int8), np.broadcast_to(num, n).astype(np.int8),
+                             np.broadcast_to(val, n).astype(np.int16))
+
+# A clean bar is an index range into the pool's ChannelEvents: (src_tpb, source_name, bar_index, start_idx, end_idx)
+PoolBar = Tuple[int, str, int, int, int]
+
+def track_channels(score: Score) -> Tuple[List[int], np.ndarray]:
+    """symusic does not keep MIDI channels, so hand them out per track (drums stay on 9).
+
+    Returns each track's channel and the program of every channel. A file with more than
+    15 melodic tracks shares channels between tracks of the same program instead; past
+    15 distinct programs those wrap too and keep their first program.
+    """
+    melodic = [c for c in range(16) if c != 9]
+    channels: List[int] = []
+    programs = np.zeros(16, dtype=np.int8)
+    per_track = sum(1 for tr in score.tracks if not tr.is_drum) <= len(melodic)
+    seen: List[int] = []  # melodic tracks' programs in first-use order (per-program fallback)
+    k = -1
+    for tr in score.tracks:
+        if tr.is_drum:
+            channels.append(9)
+            programs[9] = tr.program
+            continue
+        if per_track:
+            k += 1
+        else:
+            if tr.program not in seen:
+                seen.append(tr.program)
+            k = seen.index(tr.program)
+        if k < len(melodic):
+            programs[melodic[k]] = tr.program
+        channels.append(melodic[k % len(melodic)])
+    return channels, programs
+
+def empty_events() -> ChannelEvents:
+    return ChannelEvents.of([], EV_NOTE_OFF, 0, 0, 0)
+
+def iter_abs_events(score: Score, channels: Optional[List[int]] = None) -> ChannelEvents:
+    """Flatten the notes, control changes and pitch bends of every track into time-sorted event arrays."""
+    offs: List[ChannelEvents] = []
+    others: List[ChannelEvents] = []
+    ons: List[ChannelEvents] = []
+    if channels is None:
+        channels = track_channels(score)[0]
+    for tr, ch in zip(score.tracks, channels):
+        if len(tr.notes):
+            arr = tr.notes.numpy()
+            start = arr["time"].astype(np.int64)
+            # A zero-length note would write its note_off before its note_on
+            end = start + np.maximum(arr["duration"].astype(np.int64), 1)
+            ons.append(ChannelEvents.of(start, EV_NOTE_ON, ch, arr["pitch"], arr["velocity"]))
+            offs.append(ChannelEvents.of(end, EV_NOTE_OFF, ch, arr["pitch"], 0))
+        if len(tr.controls):
+            arr = tr.controls.numpy()
+            others.append(ChannelEvents.of(arr["time"], EV_CONTROL, ch, arr["number"], arr["value"]))
+        if len(tr.pitch_bends):
+            arr = tr.pitch_bends.numpy()
+            others.append(ChannelEvents.of(arr["time"], EV_PITCHWHEEL, ch, 0, arr["value"]))
+    if not (offs or others):
+        return empty_events()
+    # Offs go first so a stable sort releases a note before re-striking it on the same tick;
+    # controls and bends come before the notes they affect
+    events = ChannelEvents.concat(offs + others + ons)
+    return events.take(np.argsort(events.t, kind="stable"))
+
+def get_time_signature(score: Score) -> Tuple[int, int]:
+    if len(score.time_signatures):
+        ts = score.time_signatures[0]
         return ts.numerator, ts.denominator
     return 4, 4
 
-def get_tempo(mid: MidiFile) -> int:
-    st = first_meta(mid, "set_tempo")
-    if st:
-        return st.tempo
+def get_tempo(score: Score) -> int:
+    if len(score.tempos):
+        return score.tempos[0].mspq
     return bpm2tempo(120)
 
 def ticks_per_bar(tpb: int, numerator: int, denominator: int) -> int:
     bar_beats = numerator * (4.0 / float(denominator))
     return max(1, int(round(tpb * bar_beats)))
 
-def to_delta_track(abs_events: List[Tuple[int, Message]]) -> MidiTrack:
+def to_delta_track(abs_events: ChannelEvents) -> MidiTrack:
+    """Materialize mido Messages (with delta times) from sorted event arrays."""
     track = MidiTrack()
-    if not abs_events:
-        return track
     last = 0
-    for t, msg in abs_events:
-        dt = int(max(0, t - last))
-        msg.time = dt
-        track.append(msg)
+    for t, kind, ch, num, val in zip(*(a.tolist() for a in abs_events)):
+        dt = max(0, t - last)
+        if kind == EV_NOTE_ON:
+            track.append(Message("note_on", channel=ch, note=num, velocity=val, time=dt))
+        elif kind == EV_NOTE_OFF:
+            track.append(Message("note_off", channel=ch, note=num, time=dt))
+        elif kind == EV_CONTROL:
+            track.append(Message("control_change", channel=ch, control=num, value=val, time=dt))
+        elif kind == EV_PITCHWHEEL:
+            track.append(Message("pitchwheel", channel=ch, pitch=val, time=dt))
+        else:
+            track.append(Message("program_change", channel=ch, program=num, time=dt))
         last = t
     return track
 
-def scale_events(abs_events: List[Tuple[int, Message]], scale: float) -> List[Tuple[int, Message]]:
-    return [(int(round(t * scale)), m) for t, m in abs_events]
+def scale_events(abs_events: ChannelEvents, tpb_out: int, src_tpb) -> ChannelEvents:
+    """Rescale ticks from src_tpb (int or per-event array) to tpb_out, rounding half up in exact integer math."""
+    return abs_events._replace(t=(abs_events.t * tpb_out + src_tpb // 2) // src_tpb)
+
+def load_midis(paths: List[Path]) -> List[Tuple[str, Score]]:
+    """Parse the files concurrently (symusic releases the GIL while parsing); keeps the order of `paths`."""
+    midis: List[Tuple[str, Score]] = []
+    if not paths:
+        return midis
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as ex:
+        futures = [(p, ex.submit(Score, str(p), ttype="tick")) for p in paths]
+        for p, fut in futures:
+            try:
+                midis.append((p.name, fut.result()))
+            except Exception as e:
+                print(f"[warn] Could not read {p.name}: {e}")
+    return midis
 
 # =============================
 # Bar extraction (safe bars only)
 # =============================
 
-def extract_clean_bars(mid: MidiFile) -> List[List[Tuple[int, Message]]]:
-    """Detect bar boundaries and return bars that start and end in silence."""
-    tpb = mid.ticks_per_beat
-    num, den = get_time_signature(mid)
+def extract_clean_bars(score: Score) -> Tuple[ChannelEvents, List[Tuple[int, int]]]:
+    """Detect bar boundaries and return bars that start and end in silence.
+
+    Returns the events of the clean bars (ticks made relative to their bar) and the
+    (start_idx, end_idx) range of every bar within them. Each bar opens with a
+    program_change for every channel it uses, so it keeps its instruments wherever it lands.
+    """
+    tpb = score.ticks_per_quarter
+    num, den = get_time_signature(score)
     bar_len = ticks_per_bar(tpb, num, den)
 
-    events = iter_abs_messages(mid)
-    if not events:
-        return []
-
-    end_time = events[-1][0]
-    n_bars = max(1, (end_time // bar_len) + 1)
-
-    safe_bars: List[List[Tuple[int, Message]]] = []
-    active: Dict[Tuple[int, int], int] = {}
-
-    idx = 0
-    for b in range(n_bars):
-        start = b * bar_len
-        end = (b + 1) * bar_len
-
-        while idx < len(events) and events[idx][0] < start:
-            _, m = events[idx]
-            if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
-            elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
-            idx += 1
-
-        starts_silent = (len(active) == 0)
-
-        bar_events_abs: List[Tuple[int, Message]] = []
-        scan_j = idx
-        while scan_j < len(events) and events[scan_j][0] < end:
-            t, m = events[scan_j]
-            if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
-            elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
-            rel_t = t - start
-            nm = m.copy()
-            nm.time = 0
-            bar_events_abs.append((rel_t, nm))
-            scan_j += 1
-
-        ends_silent = (len(active) == 0)
-
-        if starts_silent and ends_silent and bar_events_abs:
-            bar_events_abs.sort(key=lambda x: x[0])
-            rel_track = []
-            last = 0
-            for rt, m in bar_events_abs:
-                dt = int(max(0, rt - last))
-                m.time = dt
-                rel_track.append((rt, m))
-                last = rt
-            safe_bars.append(rel_track)
-
-        idx = scan_j
-
-    return [[(rt, m.copy()) for (rt, m) in bar] for bar in safe_bars]
+    channels, programs = track_channels(score)
+    events = iter_abs_events(score, channels)
+    t = events.t
+    if not len(t):
+        return events, []
+
+    bar_idx = t // bar_len
+    n_bars = int(bar_idx[-1]) + 1
+    # First event index of every bar (plus the end), found in a single searchsorted pass
+    bounds = np.searchsorted(bar_idx, np.arange(n_bars + 1), side="left")
+    # open_before[i] = notes sounding just before event i (each note adds one on and one off)
+    open_before = np.zeros(len(t) + 1, dtype=np.int64)
+    np.cumsum((events.kind == EV_NOTE_ON).astype(np.int64) - (events.kind == EV_NOTE_OFF), out=open_before[1:])
+    silent_at = open_before[bounds] == 0
+
+    # Empty bars (no events between two boundaries) are dropped up front, together with the
+    # silence test, so only the surviving bars are ever visited in Python
+    starts, ends = bounds[:-1], bounds[1:]
+    keep = (ends > starts) & silent_at[:-1] & silent_at[1:]
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        return empty_events(), []
+
+    # Gather the clean bars, then put one program change per (bar, channel) in front of each bar
+    lengths = ends - starts
+    idx = np.concatenate([np.arange(s, e) for s, e in zip(starts.tolist(), ends.tolist())])
+    bar_events = events.take(idx)._replace(t=t[idx] - bar_idx[idx] * bar_len)
+    bar_of = np.repeat(np.arange(len(starts), dtype=np.int64), lengths)
+    used = np.unique(bar_of * 16 + bar_events.ch)
+    used_ch = used % 16
+    prog_events = ChannelEvents(np.zeros(len(used), dtype=np.int64), np.full(len(used), EV_PROGRAM, dtype=np.int8),
+                                used_ch.astype(np.int8), programs[used_ch], np.zeros(len(used), dtype=np.int16))
+    # Program changes are listed first, so the stable sort by bar puts them at the head of their bar
+    order = np.argsort(np.concatenate([used // 16, bar_of]), kind="stable")
+    out = ChannelEvents.concat([prog_events, bar_events]).take(order)
+    bounds = np.concatenate([[0], np.cumsum(lengths + np.bincount(used // 16, minlength=len(starts)))])
+    safe_bars: List[Tuple[int, int]] = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    return out, safe_bars
 
 # =============================
 # Melody building from spins
 # =============================
 
-def build_from_spins(midis: List[Tuple[str, MidiFile]], spins: List[int], tpb_out: int, seed: Optional[int]) -> Tuple[MidiFile, str]:
-    rng = random.Random(seed)
+def build_pool(midis: List[Tuple[str, Score]]) -> Tuple[List[PoolBar], ChannelEvents, int, Tuple[int, int]]:
+    """Collect the clean bars of every file once; the result is reused by every compose.
 
-    # Pool of clean bars across all files
-    pool: List[Tuple[int, str, int, List[Tuple[int, Message]]]] = []  # (src_tpb, source_name, bar_index, bar_events)
+    The event arrays of all files are concatenated so that a phrase can be gathered
+    from the pool with a single fancy-index per field.
+    """
+    pool: List[PoolBar] = []
+    chunks: List[ChannelEvents] = []
+    offset = 0
     base_tempo = None
     base_ts = None
 
-    for name, mid in midis:
-        bars_list = extract_clean_bars(mid)
+    for name, score in midis:
+        rel_events, bars_list = extract_clean_bars(score)
         if not bars_list:
             continue
+        chunks.append(rel_events)
         if base_tempo is None:
-            base_tempo = get_tempo(mid)
+            base_tempo = get_tempo(score)
         if base_ts is None:
-            base_ts = get_time_signature(mid)
-        for i, b in enumerate(bars_list):
-            pool.append((mid.ticks_per_beat, name, i, b))
+            base_ts = get_time_signature(score)
+        for i, (start_idx, end_idx) in enumerate(bars_list):
+            pool.append((score.ticks_per_quarter, name, i, offset + start_idx, offset + end_idx))
+        offset += len(rel_events.t)
+
+    pool_events = ChannelEvents.concat(chunks) if chunks else empty_events()
+    tempo = base_tempo if base_tempo is not None else bpm2tempo(120)
+    time_sig = base_ts if base_ts is not None else (4, 4)
+    return pool, pool_events, tempo, time_sig
+
+def build_from_spins(pool: List[PoolBar], pool_events: ChannelEvents, tempo: int, time_sig: Tuple[int, int],
+                     spins: List[int], tpb_out: int, seed: Optional[int]) -> Tuple[MidiFile, str]:
+    rng = random.Random(seed)
 
     if not pool:
         raise RuntimeError("No clean bars found in the provided MIDIs.")
 
-    tempo = base_tempo if base_tempo is not None else bpm2tempo(120)
-    num, den = base_ts if base_ts is not None else (4, 4)
+    num, den = time_sig
 
     phrase_len_bars = 4  # each spin → a 4-bar phrase
-    dice_table: List[List[List[Tuple[int, str, int, List[Tuple[int, Message]]]]]] = []
-
-    for spin_idx in range(len(spins)):
-        # Shuffle pool and partition into 11 choices × 4 bars
-        shuffled = pool[:]
-        rng.shuffle(shuffled)
-        choices_for_spin: List[List[Tuple[int, str, int, List[Tuple[int, Message]]]]] = []
-        pos = 0
-        for _ in range(11):  # sums 2..12
-            phrase = [shuffled[(pos + k) % len(shuffled)] for k in range(phrase_len_bars)]
-            pos = (pos + phrase_len_bars) % len(shuffled)
-            choices_for_spin.append(phrase)
-        dice_table.append(choices_for_spin)
 
     # Assemble events
-    events: List[Tuple[int, Message]] = []
-    abs_out_time = 0
+    chosen: List[PoolBar] = []
     bar_len_out = ticks_per_bar(tpb_out, num, den)
     log_lines = []
 
     for spin_idx, total in enumerate(spins):
         total = max(2, min(12, int(total)))
-        phrase = dice_table[spin_idx][total - 2]
-        log_lines.append(f"Spin {spin_idx+1}: total={total} → phrase from {[name for (_, name, _, _) in phrase]}")
-        for src_tpb, name, bar_idx, bar in phrase:
-            scale = tpb_out / float(src_tpb)
-            rel_abs = [(int(round(rt * scale)), m.copy()) for (rt, m) in bar]
-            rebased = [(abs_out_time + t, m) for (t, m) in rel_abs]
-            events.extend(rebased)
-            abs_out_time += bar_len_out
+        # The shuffled pool is conceptually split into 11 consecutive 4-bar choices (sums 2..12);
+        # only the one matching the dice total is ever used, so pick it directly
+        shuffled = pool[:]
+        rng.shuffle(shuffled)
+        pos = ((total - 2) * phrase_len_bars) % len(shuffled)
+        phrase = [shuffled[(pos + k) % len(shuffled)] for k in range(phrase_len_bars)]
+        log_lines.append(f"Spin {spin_idx+1}: total={total} → phrase from {[name for (_, name, _, _, _) in phrase]}")
+        chosen.extend(phrase)
+
+    # Gather every chosen bar at once, then rescale and rebase all ticks in a single pass
+    lengths = np.array([end_idx - start_idx for (_, _, _, start_idx, end_idx) in chosen], dtype=np.int64)
+    idx = np.concatenate([np.arange(start_idx, end_idx) for (_, _, _, start_idx, end_idx) in chosen])
+    src_tpb = np.repeat(np.array([src_tpb for (src_tpb, _, _, _, _) in chosen], dtype=np.int64), lengths)
+    bar_offset = np.repeat(np.arange(len(chosen), dtype=np.int64) * bar_len_out, lengths)
+    events = scale_events(pool_events.take(idx), tpb_out, src_tpb)
+    events = events._replace(t=events.t + bar_offset)
 
     # Build MIDI
-    events.sort(key=lambda x: x[0])
+    events = events.take(np.argsort(events.t, kind="stable"))
     out = MidiFile(ticks_per_beat=tpb_out)
     track = MidiTrack()
     out.tracks.append(track)
@@ -218,14 +314,24 @@ def build_from_spins(midis: List[Tuple[str, MidiFile]], spins: List[int], tpb_ou
 # GUI with animated dice (no external assets)
 # =============================
 class DiceCanvas(tk.Canvas):
+    # Pip positions (3x3 grid) for each face
+    SPOTS = {
+        1: [(1,1)],
+        2: [(0,0),(2,2)],
+        3: [(0,0),(1,1),(2,2)],
+        4: [(0,0),(2,0),(0,2),(2,2)],
+        5: [(0,0),(2,0),(1,1),(0,2),(2,2)],
+        6: [(0,0),(2,0),(0,1),(2,1),(0,2),(2,2)],
+    }
+
     def __init__(self, master, size=120, gap=20, **kw):
         w = size * 2 + gap
         h = size
         super().__init__(master, width=w, height=h, bg="#222", highlightthickness=0, **kw)
         self.size = size
         self.gap = gap
-        self.left_face = 1
-        self.right_face = 1
+        self.left_face = 0
+        self.right_face = 0
         self._draw_static()
         self.draw_faces(1, 1)
 
@@ -236,30 +342,31 @@ class DiceCanvas(tk.Canvas):
         # Rounded rectangles for dice bodies
         self.create_rectangle(10, 10, 10 + s, 10 + s, fill="#fafafa", width=0, tags=("dieL",))
         self.create_rectangle(10 + s + g, 10, 10 + s + g + s, 10 + s, fill="#fafafa", width=0, tags=("dieR",))
+        # All 9 pip slots per die are created once (hidden); faces only toggle their state
+        self._create_pips(10, 10, s, "L")
+        self._create_pips(10 + s + g, 10, s, "R")
 
-    def draw_faces(self, left: int, right: int):
-        self.left_face, self.right_face = left, right
-        # Clear previous pips
-        self.delete("pip")
-        # Draw pips for each die
-        self._draw_pips(10, 10, self.size, left)
-        self._draw_pips(10 + self.size + self.gap, 10, self.size, right)
-
-    def _draw_pips(self, x, y, s, n):
-        # Pip positions (3x3 grid)
+    def _create_pips(self, x, y, s, side):
         cx = [x + s*0.2, x + s*0.5, x + s*0.8]
         cy = [y + s*0.2, y + s*0.5, y + s*0.8]
-        spots = {
-            1: [(1,1)],
-            2: [(0,0),(2,2)],
-            3: [(0,0),(1,1),(2,2)],
-            4: [(0,0),(2,0),(0,2),(2,2)],
-            5: [(0,0),(2,0),(1,1),(0,2),(2,2)],
-            6: [(0,0),(2,0),(0,1),(2,1),(0,2),(2,2)],
-        }
         r = max(4, int(s*0.06))
-        for (ix, iy) in spots.get(n, []):
-            self.create_oval(cx[ix]-r, cy[iy]-r, cx[ix]+r, cy[iy]+r, fill="#111", width=0, tags=("pip",))
+        for ix in range(3):
+            for iy in range(3):
+                self.create_oval(cx[ix]-r, cy[iy]-r, cx[ix]+r, cy[iy]+r, fill="#111", width=0,
+                                 state="hidden", tags=("pip", f"die{side}_{ix}{iy}"))
+
+    def draw_faces(self, left: int, right: int):
+        if left != self.left_face:
+            self._show_pips("L", left)
+        if right != self.right_face:
+            self._show_pips("R", right)
+        self.left_face, self.right_face = left, right
+
+    def _show_pips(self, side, n):
+        on = self.SPOTS.get(n, [])
+        for ix in range(3):
+            for iy in range(3):
+                self.itemconfigure(f"die{side}_{ix}{iy}", state="normal" if (ix, iy) in on else "hidden")
 
 class MozartDiceGame(tk.Tk):
     def __init__(self):
@@ -268,7 +375,7 @@ class MozartDiceGame(tk.Tk):
         self.geometry("920x720")
         self.resizable(True, True)
 
-        # Load MIDI files from this folder
+        # Find MIDI files in this folder (they are parsed on the first compose)
         here = Path(__file__).parent
         preferred = ["confuta.mid", "jm_mozdi.mid", "mozeine.mid", "cosifn2t.mid"]
         paths = []
@@ -281,23 +388,20 @@ class MozartDiceGame(tk.Tk):
             if p.resolve() not in seen:
                 paths.append(p)
 
-        self.midis: List[Tuple[str, MidiFile]] = []
-        for p in paths:
-            try:
-                self.midis.append((p.name, MidiFile(str(p))))
-            except Exception as e:
-                print(f"[warn] Could not read {p.name}: {e}")
-
-        if not self.midis:
+        if not paths:
             messagebox.showerror("No MIDI files", "No .mid files found next to this app. Place your Mozart MIDIs beside the game and restart.")
             self.destroy()
             return
 
-        # Header: files loaded
+        self._paths: List[Path] = paths
+        self.midis: Optional[List[Tuple[str, Score]]] = None
+        self._pool: Optional[List[PoolBar]] = None
+
+        # Header: files found
         head = ttk.Frame(self)
         head.pack(fill=tk.X, padx=14, pady=(14, 8))
-        ttk.Label(head, text="Mozart files loaded:", font=("Segoe UI", 10, "bold")).pack(anchor=tk.W)
-        ttk.Label(head, text=", ".join([name for name, _ in self.midis]), wraplength=880).pack(anchor=tk.W)
+        ttk.Label(head, text="Mozart files found:", font=("Segoe UI", 10, "bold")).pack(anchor=tk.W)
+        ttk.Label(head, text=", ".join([p.name for p in paths]), wraplength=880).pack(anchor=tk.W)
 
         # Dice canvas
         self.dice = DiceCanvas(self, size=140, gap=40)
@@ -342,7 +446,8 @@ class MozartDiceGame(tk.Tk):
         ttk.Label(out, text="Output file:").grid(row=0, column=0, sticky=tk.W)
         self.out_var = tk.StringVar(value="mozart_dice_visual.mid")
         ttk.Entry(out, textvariable=self.out_var, width=42).grid(row=0, column=1, padx=(6,12))
-        ttk.Button(out, text="Compose", command=self.compose).grid(row=0, column=2, padx=6)
+        self.compose_btn = ttk.Button(out, text="Compose", command=self.compose)
+        self.compose_btn.grid(row=0, column=2, padx=6)
         ttk.Button(out, text="Play", command=self.play_output).grid(row=0, column=3, padx=6)
 
         # Log
@@ -355,6 +460,7 @@ class MozartDiceGame(tk.Tk):
         self.current_rolls: List[int] = []
         self.animating = False
         self.after_id = None
+        self._rng = random.Random()  # dedicated dice RNG, separate from the seeded composer RNG
         self.reset_game()
 
     # ---------- Dice animation ----------
@@ -372,7 +478,7 @@ class MozartDiceGame(tk.Tk):
                 messagebox.showerror("Invalid", "Forced result must be an integer between 2 and 12.")
                 return
             # Show directly without animation
-            left = random.randint(1,6)
+            left = self._rng.randrange(1,7)
             right = total - left
             if right < 1 or right > 6:
                 # If impossible split, just display both equal-ish
@@ -393,15 +499,15 @@ class MozartDiceGame(tk.Tk):
 
     def _animate_step(self, i, total_frames):
         # Random faces during spin
-        lf = random.randint(1,6)
-        rf = random.randint(1,6)
+        lf = self._rng.randrange(1,7)
+        rf = self._rng.randrange(1,7)
         self.dice.draw_faces(lf, rf)
         if i < total_frames:
             self.after_id = self.after(50, self._animate_step, i+1, total_frames)
         else:
             # Final roll
-            d1 = random.randint(1,6)
-            d2 = random.randint(1,6)
+            d1 = self._rng.randrange(1,7)
+            d2 = self._rng.randrange(1,7)
             self.dice.draw_faces(d1, d2)
             self.animating = False
             self.append_roll(d1 + d2, forced=False, d1=d1, d2=d2)
@@ -452,23 +558,49 @@ class MozartDiceGame(tk.Tk):
             messagebox.showinfo("Incomplete", f"You chose {spins_needed} spins. Current: {len(self.current_rolls)}")
             return
         seed, tpb = self._collect_seed_tpb()
-        try:
-            mid, log_text = build_from_spins(self.midis, self.current_rolls, tpb_out=tpb, seed=seed)
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not build melody: {e}")
-            return
         out_name = (self.out_var.get() or "mozart_dice_visual.mid").strip()
         if not out_name.lower().endswith('.mid'):
             out_name += '.mid'
+        # Build + save on a worker thread so the window keeps repainting; Tk is only touched via after()
+        self.compose_btn.config(state=tk.DISABLED)
+        if self._pool is None:
+            self._log(f"Loading {len(self._paths)} MIDI files…")
+        threading.Thread(target=self._compose_worker, args=(list(self.current_rolls), seed, tpb, out_name),
+                         daemon=True).start()
+
+    def _load_pool(self):
+        midis = load_midis(self._paths)
+        if not midis:
+            raise RuntimeError("None of the MIDI files could be read.")
+        # Clean bars never change during a session, so extract them once for all composes
+        pool, self._pool_events, self._base_tempo, self._base_ts = build_pool(midis)
+        self.midis = midis
+        self._pool = pool  # assigned last: marks the load as done
+
+    def _compose_worker(self, rolls: List[int], seed: Optional[int], tpb: int, out_name: str):
+        try:
+            if self._pool is None:
+                self._load_pool()
+            mid, log_text = build_from_spins(self._pool, self._pool_events, self._base_tempo, self._base_ts,
+                                             rolls, tpb_out=tpb, seed=seed)
+        except Exception as e:
+            self.after(0, self._compose_failed, "Error", f"Could not build melody: {e}")
+            return
         try:
             out_path = Path(out_name).resolve()
             mid.save(str(out_path))
         except Exception as e:
-            messagebox.showerror("Save error", f"Could not save MIDI: {e}")
+            self.after(0, self._compose_failed, "Save error", f"Could not save MIDI: {e}")
             return
-        self._log("\nSaved: " + str(out_path))
-        self._log("--- Melody Details ---")
-        self._log(log_text)
+        self.after(0, self._compose_done, out_path, log_text)
+
+    def _compose_done(self, out_path: Path, log_text: str):
+        self.compose_btn.config(state=tk.NORMAL)
+        self._log_batch(["\nSaved: " + str(out_path), "--- Melody Details ---", log_text])
+
+    def _compose_failed(self, title: str, msg: str):
+        self.compose_btn.config(state=tk.NORMAL)
+        messagebox.showerror(title, msg)
 
     def play_output(self):
         out_name = (self.out_var.get() or "mozart_dice_visual.mid").strip()
@@ -489,6 +621,13 @@ class MozartDiceGame(tk.Tk):
         self.log.insert(tk.END, msg + "\n")
         self.log.see(tk.END)
 
+    def _log_batch(self, lines: List[str]):
+        # One insert + one scroll, so the Text widget lays out once for the whole block
+        if not lines:
+            return
+        self.log.insert(tk.END, "\n".join(lines) + "\n")
+        self.log.see(tk.END)
+
 if __name__ == "__main__":
     app = MozartDiceGame()
     app.mainloop()
@@ -1,6 +1,6 @@
 # spin_game_gui.py
 # Mozart Dice Spin Game — GUI version
-# Requirements: pip install mido
+# Requirements: pip install mido numpy
 # Windows-only "Play" button uses os.startfile to open the generated MIDI in your default player (e.g., VLC)
 # Place this file next to your Mozart MIDIs (confuta.mid, jm_mozdi.mid, mozeine.mid, cosifn2t.mid, etc.)
 
@@ -8,56 +8,62 @@ from __future__ import annotations
 import os
 import random
 import tkinter as tk
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, NamedTuple, Optional
 
 try:
     from mido import MidiFile, MidiTrack, Message, MetaMessage, bpm2tempo
 except Exception:
     raise SystemExit("This app needs the 'mido' package. Install with: pip install mido")
 
+try:
+    import numpy as np
+except Exception:
+    raise SystemExit("This app needs the 'numpy' package. Install with: pip install numpy")
+
 # -----------------------------
 # MIDI helpers
 # -----------------------------
-CHANNEL_MSGS = {"note_on", "note_off", "control_change", "program_change", "pitchwheel", "aftertouch", "polytouch"}
+CHANNEL_MSGS: frozenset[str] = frozenset({"note_on", "note_off", "control_change", "program_change", "pitchwheel", "aftertouch", "polytouch"})
 
-def is_channel_msg(msg) -> bool:
-    return (not getattr(msg, "is_meta", False)) and (msg.type in CHANNEL_MSGS)
 
-
-def iter_abs_messages(mid: MidiFile) -> List[Tuple[int, Message]]:
-    events: List[Tuple[int, Message]] = []
+def iter_abs_messages(mid: MidiFile) -> Tuple[np.ndarray, List[Message]]:
+    """
+    Return (abs_ticks, msgs): the channel messages of all tracks in time order and their absolute ticks.
+    The messages are the file's own objects, not copies; treat them as read-only and copy on output.
+    """
+    tick_parts: List[np.ndarray] = []
+    msgs_flat: List[Message] = []
     for tr in mid.tracks:
-        t = 0
-        for msg in tr:
-            t += msg.time
-            if is_channel_msg(msg):
-                events.append((t, msg.copy()))
-    events.sort(key=lambda x: x[0])
-    return events
-
-
-def first_meta(mid: MidiFile, meta_type: str):
+        abs_t = np.cumsum(np.fromiter((msg.time for msg in tr), dtype=np.int64, count=len(tr)))
+        keep = [i for i, msg in enumerate(tr) if not msg.is_meta and msg.type in CHANNEL_MSGS]
+        tick_parts.append(abs_t[keep])
+        msgs_flat.extend(tr[i] for i in keep)
+    if not msgs_flat:
+        return np.zeros(0, dtype=np.int64), msgs_flat
+    ticks = np.concatenate(tick_parts)
+    # Stable: same-tick messages keep their per-track file order, as with the former sort/merge
+    perm = np.argsort(ticks, kind="stable")
+    return ticks[perm], [msgs_flat[i] for i in perm.tolist()]
+
+
+def scan_meta(mid: MidiFile) -> Tuple[int, Tuple[int, int]]:
+    """Return (tempo, (numerator, denominator)) from the first set_tempo / time_signature, in one pass."""
+    tempo = None
+    ts = None
     for tr in mid.tracks:
         for msg in tr:
-            if getattr(msg, "is_meta", False) and msg.type == meta_type:
-                return msg
-    return None
-
-
-def get_time_signature(mid: MidiFile) -> Tuple[int, int]:
-    ts = first_meta(mid, "time_signature")
-    if ts:
-        return ts.numerator, ts.denominator
-    return 4, 4
-
-
-def get_tempo(mid: MidiFile) -> int:
-    st = first_meta(mid, "set_tempo")
-    if st:
-        return st.tempo
-    return bpm2tempo(120)
+            if msg.is_meta:
+                if msg.type == "set_tempo" and tempo is None:
+                    tempo = msg.tempo
+                elif msg.type == "time_signature" and ts is None:
+                    ts = (msg.numerator, msg.denominator)
+                if tempo is not None and ts is not None:
+                    return tempo, ts
+    return (tempo if tempo is not None else bpm2tempo(120)), (ts if ts is not None else (4, 4))
 
 
 def ticks_per_bar(tpb: int, numerator: int, denominator: int) -> int:
@@ -65,165 +71,234 @@ def ticks_per_bar(tpb: int, numerator: int, denominator: int) -> int:
     return max(1, int(round(tpb * bar_beats)))
 
 
-def to_delta_track(abs_events: List[Tuple[int, Message]]) -> MidiTrack:
-    track = MidiTrack()
-    if not abs_events:
+def to_delta_track(ticks: np.ndarray, msgs: List[Message], idx: np.ndarray,
+                   track: Optional[MidiTrack] = None) -> MidiTrack:
+    """
+    Append msgs[idx[k]] at absolute tick ticks[k] to `track` (a new one if None), with delta times.
+    This is the only place messages get copied: each template is copied once, straight into the track.
+    """
+    if track is None:
+        track = MidiTrack()
+    if not len(ticks):
         return track
-    last = 0
-    for t, msg in abs_events:
-        dt = int(max(0, t - last))
-        msg.time = dt
-        track.append(msg)
-        last = t
+    dts = np.diff(ticks, prepend=np.int64(0))
+    dts[dts < 0] = 0
+    track.extend(msgs[i].copy(time=dt) for i, dt in zip(idx.tolist(), dts.tolist()))
     return track
 
 
-def scale_events(abs_events: List[Tuple[int, Message]], scale: float) -> List[Tuple[int, Message]]:
-    return [(int(round(t * scale)), m) for t, m in abs_events]
+def load_midis(paths: List[Path]) -> List[Tuple[str, MidiFile]]:
+    """Parse the files concurrently (overlaps file I/O); keeps the order of `paths`."""
+    midis: List[Tuple[str, MidiFile]] = []
+    if not paths:
+        return midis
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as ex:
+        futures = [(p, ex.submit(MidiFile, str(p))) for p in paths]
+        for p, fut in futures:
+            try:
+                midis.append((p.name, fut.result()))
+            except Exception as e:
+                print(f"[warn] Could not read {p.name}: {e}")
+    return midis
 
 # -----------------------------
 # Bar extraction (safe bars only)
 # -----------------------------
+# A clean bar: (rel_ticks int64, msg_idx int32) pointing into its file's message list
+Bar = Tuple[np.ndarray, np.ndarray]
+
+def note_arrays(msgs: List[Message]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """One pass over the messages -> (is_note_on, is_note_off, key) arrays, key = channel*128 + note."""
+    n = len(msgs)
+    # Filled through plain buffers (cheap per-item stores) and viewed as numpy arrays without a copy
+    kind = bytearray(n)  # 0 = not a note event, 1 = note on, 2 = note off
+    key = array("h", [0]) * n
+    for i, m in enumerate(msgs):
+        if m.type == "note_on":
+            kind[i] = 1 if m.velocity > 0 else 2
+        elif m.type == "note_off":
+            kind[i] = 2
+        else:
+            continue
+        key[i] = m.channel * 128 + m.note
+    kinds = np.frombuffer(kind, dtype=np.uint8)
+    return kinds == 1, kinds == 2, np.frombuffer(key, dtype=np.int16)
 
-def extract_clean_bars(mid: MidiFile) -> List[List[Tuple[int, Message]]]:
+
+def scan_bars(ticks: np.ndarray, is_on: np.ndarray, is_off: np.ndarray, key: np.ndarray,
+              bar_len: int) -> List[Tuple[int, int, int]]:
+    """
+    Bar detection on plain typed arrays (time-ordered events, no Message objects).
+    Returns (bar_number, start_idx, end_idx) for every non-empty bar that starts and ends in silence.
+    """
+    n = len(ticks)
+    if n == 0:
+        return []
+    # A (channel, note) is sounding iff its latest note event was a note_on (repeated on/off are no-ops).
+    # Group note events per key (time order is kept inside a group) and record where the state flips.
+    note_ev = np.flatnonzero(is_on | is_off)
+    by_key = note_ev[np.argsort(key[note_ev], kind="stable")]
+    state = is_on[by_key].astype(np.int64)
+    prev = np.zeros_like(state)
+    prev[1:] = state[:-1]
+    prev[np.flatnonzero(np.diff(key[by_key]) != 0) + 1] = 0
+    delta = np.zeros(n, dtype=np.int64)
+    delta[by_key] = state - prev
+    # open_before[i] = notes sounding just before event i
+    open_before = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(delta, out=open_before[1:])
+
+    bar_idx = ticks // bar_len
+    n_bars = int(bar_idx[-1]) + 1
+    bounds = np.searchsorted(bar_idx, np.arange(n_bars + 1), side="left")
+    silent_at = open_before[bounds] == 0
+    starts, ends = bounds[:-1], bounds[1:]
+    keep = np.flatnonzero((ends > starts) & silent_at[:-1] & silent_at[1:])
+    return list(zip(keep.tolist(), starts[keep].tolist(), ends[keep].tolist()))
+
+
+def extract_clean_bars(mid: MidiFile, time_sig: Optional[Tuple[int, int]] = None) -> Tuple[List[Message], List[Bar]]:
     """
     Detect bar boundaries and return bars that start and end in silence (no sustained notes crossing).
-    Returned as list of bars; each bar is list of (rel_tick, msg) with delta times within the bar.
+    Returned as (msgs, bars); each bar is (rel_ticks, msg_idx) — ticks relative to the bar start and
+    indices into msgs, so no message is copied here.
     """
     tpb = mid.ticks_per_beat
-    num, den = get_time_signature(mid)
+    num, den = time_sig if time_sig is not None else scan_meta(mid)[1]
     bar_len = ticks_per_bar(tpb, num, den)
 
-    events = iter_abs_messages(mid)
-    if not events:
-        return []
+    ticks, msgs = iter_abs_messages(mid)
+    if not msgs:
+        return msgs, []
+    is_on, is_off, key = note_arrays(msgs)
 
-    end_time = events[-1][0]
-    n_bars = max(1, (end_time // bar_len) + 1)
-
-    safe_bars: List[List[Tuple[int, Message]]] = []
-    active: Dict[Tuple[int, int], int] = {}
-
-    idx = 0
-    for b in range(n_bars):
-        start = b * bar_len
-        end = (b + 1) * bar_len
-
-        while idx < len(events) and events[idx][0] < start:
-            _, m = events[idx]
-            if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
-            elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
-            idx += 1
-
-        starts_silent = (len(active) == 0)
-
-        bar_events_abs: List[Tuple[int, Message]] = []
-        scan_j = idx
-        while scan_j < len(events) and events[scan_j][0] < end:
-            t, m = events[scan_j]
-            if m.type == "note_on" and m.velocity > 0:
-                active[(m.channel, m.note)] = m.velocity
-            elif (m.type == "note_off") or (m.type == "note_on" and m.velocity == 0):
-                active.pop((m.channel, m.note), None)
-            rel_t = t - start
-            nm = m.copy()
-            nm.time = 0
-            bar_events_abs.append((rel_t, nm))
-            scan_j += 1
-
-        ends_silent = (len(active) == 0)
-
-        if starts_silent and ends_silent and bar_events_abs:
-            bar_events_abs.sort(key=lambda x: x[0])
-            rel_track = []
-            last = 0
-            for rt, m in bar_events_abs:
-                dt = int(max(0, rt - last))
-                m.time = dt
-                rel_track.append((rt, m))
-                last = rt
-            safe_bars.append(rel_track)
-
-        idx = scan_j
-
-    return [[(rt, m.copy()) for (rt, m) in bar] for bar in safe_bars]
+    safe_bars: List[Bar] = [(ticks[s:e] - b * bar_len, np.arange(s, e, dtype=np.int32))
+                            for b, s, e in scan_bars(ticks, is_on, is_off, key, bar_len)]
+    return msgs, safe_bars
 
 # -----------------------------
 # Melody building from spins
 # -----------------------------
 
-def build_from_spins(midis: List[Tuple[str, MidiFile]], spins: List[int], tpb_out: int, seed: Optional[int]) -> Tuple[MidiFile, str]:
-    rng = random.Random(seed)
+# Everything build_from_spins needs from one file: (name, ticks_per_beat, tempo, (num, den), msgs, clean bars)
+SourceBars = Tuple[str, int, int, Tuple[int, int], List[Message], List[Bar]]
+
+
+def prepare_source(name: str, mid: MidiFile) -> SourceBars:
+    """Scan a loaded file once; MIDIs never change after load, so the result can be reused for every generation."""
+    tempo, time_sig = scan_meta(mid)
+    msgs, bars = extract_clean_bars(mid, time_sig)
+    return name, mid.ticks_per_beat, tempo, time_sig, msgs, bars
 
-    # Pool of clean bars across all files
-    pool: List[Tuple[int, str, int, List[Tuple[int, Message]]]] = []  # (src_tpb, source_name, bar_index, bar_events)
+
+class BarPool(NamedTuple):
+    """Clean bars of every file as parallel arrays; bar i owns events start[i]:end[i] of rel_ticks/msgs."""
+    src_tpb: np.ndarray     # int64 ticks per beat of the bar's source file
+    name: List[str]         # source file name
+    bar_index: np.ndarray   # int32 clean-bar number within its file
+    start: np.ndarray       # int64 first event of the bar
+    end: np.ndarray         # int64 one past its last event
+    rel_ticks: np.ndarray   # int64 event tick relative to its bar start, all bars back to back
+    msgs: List[Message]     # the event's message (shared with the source file; copied on output)
+
+
+def build_pool(sources: List[SourceBars]) -> Tuple[BarPool, int, Tuple[int, int]]:
+    """Flatten the clean bars of every file into one BarPool, once; it is reused by every generation."""
+    src_tpb: List[int] = []
+    names: List[str] = []
+    bar_index: List[int] = []
+    lengths: List[int] = []
+    tick_parts: List[np.ndarray] = []
+    msgs_flat: List[Message] = []
     base_tempo = None
     base_ts = None
 
-    for name, mid in midis:
-        bars_list = extract_clean_bars(mid)
+    for name, tpb, src_tempo, src_ts, msgs, bars_list in sources:
         if not bars_list:
             continue
         if base_tempo is None:
-            base_tempo = get_tempo(mid)
+            base_tempo = src_tempo
         if base_ts is None:
-            base_ts = get_time_signature(mid)
-        for i, b in enumerate(bars_list):
-            pool.append((mid.ticks_per_beat, name, i, b))
+            base_ts = src_ts
+        for i, (rel_ticks, msg_idx) in enumerate(bars_list):
+            src_tpb.append(tpb)
+            names.append(name)
+            bar_index.append(i)
+            lengths.append(len(rel_ticks))
+            tick_parts.append(rel_ticks)
+            msgs_flat.extend(msgs[mi] for mi in msg_idx.tolist())
+
+    end = np.cumsum(np.array(lengths, dtype=np.int64))
+    pool = BarPool(
+        src_tpb=np.array(src_tpb, dtype=np.int64),
+        name=names,
+        bar_index=np.array(bar_index, dtype=np.int32),
+        start=end - np.array(lengths, dtype=np.int64),
+        end=end,
+        rel_ticks=np.concatenate(tick_parts) if tick_parts else np.zeros(0, dtype=np.int64),
+        msgs=msgs_flat,
+    )
+    tempo = base_tempo if base_tempo is not None else bpm2tempo(120)
+    time_sig = base_ts if base_ts is not None else (4, 4)
+    return pool, tempo, time_sig
+
 
-    if not pool:
+def build_from_spins(pool: BarPool, tempo: int, time_sig: Tuple[int, int],
+                     spins: List[int], tpb_out: int, seed: Optional[int]) -> Tuple[MidiFile, str]:
+    rng = random.Random(seed)
+
+    n_bars = len(pool.name)
+    if not n_bars:
         raise RuntimeError("No clean bars found in the provided MIDIs.")
 
-    tempo = base_tempo if base_tempo is not None else bpm2tempo(120)
-    num, den = base_ts if base_ts is not None else (4, 4)
+    num, den = time_sig
 
     # For each spin (3 or 4), we map the dice sum (2..12) to a 4-bar phrase
-    # We create a dice table with 11 choices per spin. Each choice = 4 random bars from pool.
     phrase_len_bars = 4
-    dice_table: List[List[List[Tuple[int, str, int, List[Tuple[int, Message]]]]]] = []
-
-    for spin_idx in range(len(spins)):
-        rng.shuffle(pool)
-        choices_for_spin: List[List[Tuple[int, str, int, List[Tuple[int, Message]]]]] = []
-        # Build 11 choices (for sums 2..12); each choice is a list of 4 bars
-        pos = 0
-        for _ in range(11):
-            phrase = [pool[(pos + k) % len(pool)] for k in range(phrase_len_bars)]
-            pos = (pos + phrase_len_bars) % len(pool)
-            choices_for_spin.append(phrase)
-        dice_table.append(choices_for_spin)
-
-    # Assemble events
-    events: List[Tuple[int, Message]] = []
-    abs_out_time = 0
+
+    # Pick the bars of every phrase first (as pool indices), then assemble them in one go
+    chosen: List[int] = []
     bar_len_out = ticks_per_bar(tpb_out, num, den)
     log_lines = []
 
     for spin_idx, total in enumerate(spins):
         total = max(2, min(12, int(total)))
-        phrase = dice_table[spin_idx][total - 2]
-        log_lines.append(f"Spin {spin_idx+1}: total={total} → phrase from {[name for (_, name, _, _) in phrase]}")
-        # Append the 4 bars
-        for src_tpb, name, bar_idx, bar in phrase:
-            # scale rel ticks to output tpb
-            scale = tpb_out / float(src_tpb)
-            rel_abs = [(int(round(rt * scale)), m.copy()) for (rt, m) in bar]
-            rebased = [(abs_out_time + t, m) for (t, m) in rel_abs]
-            events.extend(rebased)
-            abs_out_time += bar_len_out
+        # 11 consecutive 4-bar choices (sums 2..12) drawn without replacement; sampling just those
+        # 44 bars is the same as shuffling the pool and taking its head, without touching the rest
+        choices = rng.sample(range(n_bars), min(n_bars, 11 * phrase_len_bars))
+        offset = (total - 2) * phrase_len_bars
+        phrase = [choices[(offset + k) % len(choices)] for k in range(phrase_len_bars)]
+        log_lines.append(f"Spin {spin_idx+1}: total={total} → phrase from {[pool.name[i] for i in phrase]}")
+        chosen.extend(phrase)
+
+    # Gather the events of all chosen bars with one index array
+    bars = np.array(chosen, dtype=np.int64)
+    lengths = pool.end[bars] - pool.start[bars]
+    idx = np.concatenate([np.arange(s, e) for s, e in zip(pool.start[bars].tolist(), pool.end[bars].tolist())])
+    rel_ticks = pool.rel_ticks[idx]
+    # scale rel ticks to output tpb (integer half-up rounding; bars already at tpb_out are left alone).
+    # If every chosen bar is already at tpb_out, the per-event work is skipped entirely
+    bar_tpb = pool.src_tpb[bars]
+    if (bar_tpb != tpb_out).any():
+        src_tpb = np.repeat(bar_tpb, lengths)
+        rescale = src_tpb != tpb_out
+        rel_ticks[rescale] = (rel_ticks[rescale] * tpb_out + src_tpb[rescale] // 2) // src_tpb[rescale]
+    # Each bar is already time-ordered and bars are laid end to end, so the stream only needs a sort
+    # if some source bar is longer than an output bar (e.g. a 4/4 file in a 3/4 output)
+    needs_sort = bool((rel_ticks[np.cumsum(lengths) - 1] > bar_len_out).any())
+    ticks = rel_ticks + np.repeat(np.arange(len(bars), dtype=np.int64) * bar_len_out, lengths)
+    if needs_sort:
+        perm = np.argsort(ticks, kind="stable")
+        ticks, idx = ticks[perm], idx[perm]
 
     # Build MIDI
-    events.sort(key=lambda x: x[0])
     out = MidiFile(ticks_per_beat=tpb_out)
     track = MidiTrack()
     out.tracks.append(track)
     track.append(MetaMessage("time_signature", numerator=num, denominator=den, time=0))
     track.append(MetaMessage("set_tempo", tempo=tempo, time=0))
-
-    for m in to_delta_track(events):
-        track.append(m)
+    # pool.msgs are shared templates; to_delta_track writes one copy of each straight into the track
+    to_delta_track(ticks, pool.msgs, idx, track)
 
     return out, "\n".join(log_lines)
 
@@ -250,12 +325,10 @@ class SpinGameApp(tk.Tk):
             if p.resolve() not in seen:
                 paths.append(p)
 
-        self.midis: List[Tuple[str, MidiFile]] = []
-        for p in paths:
-            try:
-                self.midis.append((p.name, MidiFile(str(p))))
-            except Exception as e:
-                print(f"[warn] Could not read {p.name}: {e}")
+        self._rng = random.Random()  # dedicated dice RNG, separate from the seeded build RNG
+        self.midis: List[Tuple[str, MidiFile]] = load_midis(paths)
+        # Clean bars, tempo and time signature are extracted once here instead of on every generate
+        self._pool, self._base_tempo, self._base_ts = build_pool([prepare_source(name, mid) for name, mid in self.midis])
 
         if not self.midis:
             messagebox.showerror("No MIDI files", "No .mid files found next to this app. Place your Mozart MIDIs beside spin_game_gui.py and restart.")
@@ -327,6 +400,13 @@ class SpinGameApp(tk.Tk):
         self.log.insert(tk.END, msg + "\n")
         self.log.see(tk.END)
 
+    def _log_batch(self, lines: List[str]):
+        # single insert + see() instead of one per line
+        if not lines:
+            return
+        self.log.insert(tk.END, "\n".join(lines) + "\n")
+        self.log.see(tk.END)
+
     def spin_once(self):
         if len(self.current_rolls) >= self.spins_var.get():
             messagebox.showinfo("All spins used", f"You chose {self.spins_var.get()} spins. Reset to play again.")
@@ -343,13 +423,20 @@ class SpinGameApp(tk.Tk):
                 return
             self._log(f"Spin {len(self.current_rolls)+1}: forced → {total}")
         else:
-            d1 = random.randint(1, 6)
-            d2 = random.randint(1, 6)
+            d1, d2 = self._roll_pair()
             total = d1 + d2
             self._log(f"Spin {len(self.current_rolls)+1}: rolled {d1}+{d2} = {total}")
         self.current_rolls.append(total)
         self.rolls_var.set(f"Rolls: {self.current_rolls}")
 
+    def _roll_pair(self) -> Tuple[int, int]:
+        # One 6-bit draw covers both dice: values 0..35 map uniformly onto the 36 (d1, d2) pairs,
+        # anything above is redrawn so there is no modulo bias
+        raw = self._rng.getrandbits(6)
+        while raw >= 36:
+            raw = self._rng.getrandbits(6)
+        return raw % 6 + 1, raw // 6 + 1
+
     def undo_last(self):
         if not self.current_rolls:
             return
@@ -381,7 +468,8 @@ class SpinGameApp(tk.Tk):
             return
         seed, tpb = self._collect_seed_tpb()
         try:
-            mid, log_text = build_from_spins(self.midis, self.current_rolls, tpb_out=tpb, seed=seed)
+            mid, log_text = build_from_spins(self._pool, self._base_tempo, self._base_ts, self.current_rolls,
+                                             tpb_out=tpb, seed=seed)
         except Exception as e:
             messagebox.showerror("Error", f"Could not build melody: {e}")
             return
@@ -394,9 +482,7 @@ class SpinGameApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Save error", f"Could not save MIDI: {e}")
             return
-        self._log("\nSaved: " + str(out_path))
-        self._log("--- Melody Details ---")
-        self._log(log_text)
+        self._log_batch(["\nSaved: " + str(out_path), "--- Melody Details ---", log_text])
 
     def play_output(self):
         out_name = (self.out_var.get() or "mozart_spins.mid").strip()